@@ -10,8 +10,10 @@ This assumes the file structure from the original compressed file:
 """
 
 from pathlib import Path
+from typing import Collection
 
 import click
+import numpy as np
 import pandas as pd
 
 from ertk.dataset import resample_audio, write_annotations, write_filelist
@@ -30,31 +32,47 @@ emotion_map = {
 }
 
 
+def _read_csv(path: Path, cols: Collection[str], **kwargs) -> pd.DataFrame:
+    """Read only the given columns, plus the unnamed index column, from
+    one of the CREMA-D CSV files.
+    """
+    return pd.read_csv(
+        path,
+        usecols=lambda c: c in cols or c.startswith("Unnamed:"),
+        low_memory=False,
+        **kwargs,
+    )
+
+
 @click.command()
 @click.argument("input_dir", type=PathlibPath(exists=True, file_okay=False))
 @click.option("--resample/--noresample", default=True)
-def main(input_dir: Path, resample: bool):
+@click.option(
+    "--n_jobs", type=int, default=-1, help="Number of parallel resampling jobs."
+)
+def main(input_dir: Path, resample: bool, n_jobs: int):
     """Process CREMA-D dataset at location INPUT_DIR."""
 
     paths = list(input_dir.glob("AudioMP3/*.mp3"))
-    write_annotations({p.stem: emotion_map[p.stem[9]] for p in paths}, "label")
-    write_annotations({p.stem: p.stem[:4] for p in paths}, "speaker")
-    write_annotations({p.stem: "en" for p in paths}, "language")
-    write_annotations({p.stem: "us" for p in paths}, "country")
+    stems = [p.stem for p in paths]
+    write_annotations({s: emotion_map[s[9]] for s in stems}, "label")
+    write_annotations({s: s[:4] for s in stems}, "speaker")
+    write_annotations(dict.fromkeys(stems, "en"), "language")
+    write_annotations(dict.fromkeys(stems, "us"), "country")
     # 1076_MTI_SAD_XX has no signal
     paths = [p for p in paths if p.stem != "1076_MTI_SAD_XX"]
     resample_dir = Path("resampled")
     if resample:
         resample_dir.mkdir(exist_ok=True)
-        resample_audio(paths, resample_dir)
+        resample_audio(paths, resample_dir, n_jobs=n_jobs)
     write_filelist(resample_dir.glob("*.wav"), "files_all")
 
-    summaryTable = pd.read_csv(
+    summaryTable = _read_csv(
         input_dir / "processedResults" / "summaryTable.csv",
-        low_memory=False,
+        {"FileName", "VoiceVote", "FaceVote", "MultiModalVote"},
         index_col=1,
     )
-    summaryTable["ActedEmo"] = summaryTable.index.map(lambda x: x[9])
+    summaryTable["ActedEmo"] = summaryTable.index.str[9]
 
     for mode in ["VoiceVote", "FaceVote", "MultiModalVote"]:
         # Proportion of majority vote equivalent to acted emotion
@@ -62,21 +80,30 @@ def main(input_dir: Path, resample: bool):
         print(f"Acted accuracy using {mode}: {accuracy:.3f}")
     print()
 
-    # Majority vote annotations from other modalities
-    valid = summaryTable["MultiModalVote"].isin(list("NHDFAS"))
-    summaryTable.loc[~valid, "MultiModalVote"] = "X"
-    write_annotations(summaryTable["MultiModalVote"].to_dict(), "label_multimodal")
-
-    valid = summaryTable["FaceVote"].isin(list("NHDFAS"))
-    summaryTable.loc[~valid, "FaceVote"] = "X"
-    write_annotations(summaryTable["FaceVote"].to_dict(), "label_face")
-
-    valid = summaryTable["VoiceVote"].isin(list("NHDFAS"))
-    summaryTable.loc[~valid, "VoiceVote"] = "X"
-    write_annotations(summaryTable["VoiceVote"].to_dict(), "label_voice")
-
-    finishedResponses = pd.read_csv(
-        input_dir / "finishedResponses.csv", low_memory=False, index_col=0
+    # Majority vote annotations from other modalities. Recoding on the
+    # categorical codes maps any invalid vote to NaN, which becomes "X".
+    categories = list("NHDFASX")
+    for mode, annot_name in [
+        ("MultiModalVote", "label_multimodal"),
+        ("FaceVote", "label_face"),
+        ("VoiceVote", "label_voice"),
+    ]:
+        votes = summaryTable[mode].astype("category").cat.set_categories(categories)
+        summaryTable[mode] = votes.fillna("X")
+        write_annotations(summaryTable[mode].to_dict(), annot_name)
+
+    finishedResponses = _read_csv(
+        input_dir / "finishedResponses.csv",
+        {
+            "sessionNums",
+            "queryType",
+            "questNum",
+            "clipNum",
+            "respEmo",
+            "respLevel",
+            "dispEmo",
+        },
+        index_col=0,
     )
     finishedResponses["respLevel"] = pd.to_numeric(
         finishedResponses["respLevel"], errors="coerce"
@@ -84,8 +111,10 @@ def main(input_dir: Path, resample: bool):
     # Remove these two duplicates
     finishedResponses = finishedResponses.drop([137526, 312184], errors="ignore")
 
-    finishedEmoResponses = pd.read_csv(
-        input_dir / "finishedEmoResponses.csv", low_memory=False, index_col=0
+    finishedEmoResponses = _read_csv(
+        input_dir / "finishedEmoResponses.csv",
+        {"sessionNums", "queryType", "questNum", "clipNum", "ttr"},
+        index_col=0,
     )
     finishedEmoResponses = finishedEmoResponses[
         ~finishedEmoResponses["clipNum"].isin([7443, 7444])
@@ -103,7 +132,8 @@ def main(input_dir: Path, resample: bool):
         + distractedResponses["questNum"]
     )
     # Get all annotations not defined to be distracted
-    goodResponses = finishedResponses[~uniqueIDs.isin(distractedIDs)]
+    distracted = np.isin(uniqueIDs.to_numpy(), distractedIDs.to_numpy())
+    goodResponses = finishedResponses[~distracted]
 
     # Responses based on different modalities
     voiceResp = goodResponses.query("queryType == 1")
@@ -116,25 +146,24 @@ def main(input_dir: Path, resample: bool):
         accuracy = (df["respEmo"] == df["dispEmo"]).mean()
         print(f"Human accuracy to acted using {s}: {accuracy:.3f}")
 
-        dataTable = (
+        # Missing responses get code -1 when unstacking, so become 0
+        # after the shift, as required by alpha()
+        codes = (
             df.set_index(["sessionNums", "clipNum"])["respEmo"]
             .astype("category")
-            .cat.codes.unstack()
-            + 1
+            .cat.codes
         )
-        dataTable[dataTable.isna()] = 0
-        data = dataTable.astype(int).to_numpy()
+        data = (codes.unstack(fill_value=-1) + 1).to_numpy(dtype=int)
         print(f"Krippendorf's alpha using {s}: {alpha(data):.3f}")
         print()
 
-    tabulatedVotes = pd.read_csv(
+    tabulatedVotes = _read_csv(
         input_dir / "processedResults" / "tabulatedVotes.csv",
-        low_memory=False,
+        {"agreement"},
         index_col=0,
     )
-    tabulatedVotes["mode"] = tabulatedVotes.index.map(
-        lambda x: ["voice", "face", "both"][x // 100000 - 1]
-    )
+    modes = np.array(["voice", "face", "both"])
+    tabulatedVotes["mode"] = modes[tabulatedVotes.index.to_numpy() // 100000 - 1]
     print("Average vote agreement per annotation mode:")
     print(tabulatedVotes.groupby("mode")["agreement"].describe())
 
@@ -9,6 +9,7 @@ This assumes the file structure from the original compressed file:
     ...
 """
 
+import os
 import shutil
 from pathlib import Path
 
@@ -34,18 +35,27 @@ emotion_map = {
 def main(input_dir: Path):
     """Process the EMO-DB dataset at location INPUT_DIR."""
     paths = list(input_dir.glob("wav_corpus/*.wav"))
-    write_annotations({p.stem: emotion_map[p.stem[5]] for p in paths}, "label")
-    speaker_dict = {p.stem: p.stem[:2] for p in paths}
+    stems = [p.stem for p in paths]
+    write_annotations({s: emotion_map[s[5]] for s in stems}, "label")
+    speaker_dict = {s: s[:2] for s in stems}
     write_annotations(speaker_dict, "speaker")
     male_speakers = ["03", "10", "11", "12", "15"]
     gender_dict = {
         k: "M" if v in male_speakers else "F" for k, v in speaker_dict.items()
     }
     write_annotations(gender_dict, "gender")
-    write_annotations({p.stem: "de" for p in paths}, "language")
+    write_annotations(dict.fromkeys(stems, "de"), "language")
     Path("resampled").mkdir(exist_ok=True)
-    for p in tqdm(paths, desc="Copying audio"):
-        shutil.copyfile(p, Path("resampled", p.name))
+    for p in tqdm(paths, desc="Linking audio"):
+        dst = Path("resampled", p.name)
+        if dst.exists() and dst.samefile(p):
+            continue
+        # Audio is already 16 kHz so hardlink where possible, falling
+        # back to a copy (e.g. across filesystems)
+        try:
+            os.link(p, dst)
+        except OSError:
+            shutil.copyfile(p, dst)
     write_filelist(Path("resampled").glob("*.wav"), "files_all")
 
 
@@ -8,12 +8,11 @@ This assumes the file structure from the original compressed file:
 """
 
 import re
-import shutil
 from pathlib import Path
 
 import click
 
-from ertk.dataset import resample_audio, write_annotations, write_filelist
+from ertk.dataset import resample_rename_clips, write_annotations, write_filelist
 from ertk.utils import PathlibPath
 
 REGEX = re.compile(r"^(DC|JE|JK|KL)([a-z][a-z]?)[0-9][0-9]$")
@@ -32,30 +31,33 @@ emotion_map = {
 @click.command()
 @click.argument("input_dir", type=PathlibPath(exists=True, file_okay=False))
 @click.option("--resample/--noresample", default=True)
-def main(input_dir: Path, resample: bool):
+@click.option(
+    "--n_jobs", type=int, default=-1, help="Number of parallel resampling jobs."
+)
+def main(input_dir: Path, resample: bool, n_jobs: int):
     """Process the SAVEE dataset at location INPUT_DIR and resample
     audio to 16 kHz 16-bit WAV audio.
     """
 
     resample_dir = Path("resampled")
     if resample:
-        for sp in ["DC", "JE", "JK", "KL"]:
-            paths = list(input_dir.glob(sp + "/*.wav"))
-            resample_audio(paths, resample_dir / sp)
-        for sp in ["DC", "JE", "JK", "KL"]:
-            for f in (resample_dir / sp).glob("*.wav"):
-                shutil.move(f, resample_dir / (sp + f.name))
-            (resample_dir / sp).rmdir()
+        # Resample all speakers in one batch, directly to final names
+        mapping = {
+            p: resample_dir / f"{sp}{p.stem}.wav"
+            for sp in ["DC", "JE", "JK", "KL"]
+            for p in input_dir.glob(sp + "/*.wav")
+        }
+        if len(mapping) == 0:
+            raise FileNotFoundError("No audio files found.")
+        resample_rename_clips(mapping=mapping, n_jobs=n_jobs)
 
     paths = list(resample_dir.glob("*.wav"))
     write_filelist(paths, "files_all")
-    write_annotations(
-        {p.stem: emotion_map[REGEX.match(p.stem).group(2)] for p in paths},
-        "label",
-    )
-    write_annotations({p.stem: p.stem[:2] for p in paths}, "speaker")
-    write_annotations({p.stem: "en" for p in paths}, "language")
-    write_annotations({p.stem: "gb" for p in paths}, "country")
+    stems = [p.stem for p in paths]
+    write_annotations({s: emotion_map[REGEX.match(s).group(2)] for s in stems}, "label")
+    write_annotations({s: s[:2] for s in stems}, "speaker")
+    write_annotations(dict.fromkeys(stems, "en"), "language")
+    write_annotations(dict.fromkeys(stems, "gb"), "country")
 
 
 if __name__ == "__main__":
@@ -159,7 +159,9 @@ def within_corpus_cross_validation(
         cross_validate_fn = tf_cross_validate
 
     start_time = time.perf_counter()
-    with joblib.Parallel(n_jobs=n_jobs, verbose=verbose):
+    # cross_validate() uses n_jobs=None, which takes n_jobs from the
+    # active backend
+    with joblib.parallel_backend("loky", n_jobs=n_jobs):
         scores = cross_validate_fn(
             clf,
             dataset.x,
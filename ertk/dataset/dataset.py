@@ -13,11 +13,13 @@ from typing import (
     Optional,
     Sequence,
     Set,
+    Tuple,
     Type,
     Union,
 )
 
 import numpy as np
+import pandas as pd
 import yaml
 from sklearn.base import TransformerMixin
 from sklearn.preprocessing import StandardScaler
@@ -75,6 +77,7 @@ class Dataset:
     _features_path: Path
     _features_dir: Path
     _subset_paths: Dict[str, Path]
+    _group_cache: Dict[str, Tuple[Dict[str, Any], List[str], Tuple[np.ndarray, ...]]]
 
     def __init__(
         self,
@@ -96,6 +99,7 @@ class Dataset:
         self._subsets = {}
         self._subset_paths = {}
         self._x = np.empty((0, 0), dtype=np.float32)
+        self._group_cache = {}
 
     @classmethod
     def _copy(cls, inst: "Dataset"):
@@ -117,6 +121,7 @@ class Dataset:
         self._subset_paths = other._subset_paths.copy()
         self._subsets = copy.deepcopy(other._subsets)
         self._x = other._x.copy()
+        self._group_cache = {}
         if len(self._x.shape) == 1:
             # Non-contiguous array, so copy each contiguous sub-array
             for i in range(len(self._x)):
@@ -347,7 +352,24 @@ class Dataset:
         A list of values, one for each instance in the datset, in the
         same order they appear in names and x.
         """
-        return [self.annotations[annot_name][x] for x in self.names]
+        annotations = self.annotations[annot_name]
+        return list(map(annotations.__getitem__, self.names))
+
+    def _factorize(self, annot_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the group index of each instance and the sorted array
+        of unique group names for a given partition. The result is
+        cached until either the names or the annotation dict are
+        replaced.
+        """
+        annotations = self.annotations[annot_name]
+        cached = self._group_cache.get(annot_name)
+        if cached is not None and cached[0] is annotations and cached[1] is self._names:
+            return cached[2]
+        # Hash-based factorize is much faster than np.unique() on strings
+        values = np.array(self.get_annotations(annot_name), dtype=object)
+        idx, groups = pd.factorize(values, sort=True)
+        self._group_cache[annot_name] = (annotations, self._names, (idx, groups))
+        return idx, groups
 
     def get_group_indices(self, annot_name: str) -> np.ndarray:
         """Gets the group indices (i.e. indices into the groups array)
@@ -362,8 +384,8 @@ class Dataset:
         --------
         A NumPy array of group indices for each instance in the dataset.
         """
-        _, idx = np.unique(self.get_annotations(annot_name), return_inverse=True)
-        return idx
+        idx, _ = self._factorize(annot_name)
+        return idx.copy()
 
     def get_group_counts(self, annot_name: str) -> np.ndarray:
         """Get group counts for a partition.
@@ -378,8 +400,8 @@ class Dataset:
         A NumPy array of counts for the corresponding group in this
         partition.
         """
-        _, counts = np.unique(self.get_annotations(annot_name), return_counts=True)
-        return counts
+        idx, groups = self._factorize(annot_name)
+        return np.bincount(idx, minlength=len(groups))
 
     def get_group_names(self, annot_name: str) -> List[str]:
         """Get the names of groups in a partition.
@@ -389,7 +411,8 @@ class Dataset:
         annot_name: str
             Annotation name.
         """
-        return list(np.unique(self.get_annotations(annot_name)))
+        _, groups = self._factorize(annot_name)
+        return list(groups)
 
     def update_speakers(
         self, speakers: Union[PathOrStr, Mapping[str, str], Sequence[str]]
@@ -1,4 +1,5 @@
 import inspect
+import os
 import typing
 import warnings
 from collections import Counter
@@ -27,22 +28,56 @@ def _filter_kwargs(meth: Callable, **kwargs) -> Dict[str, Any]:
     return kwargs
 
 
-def read_arff(path: PathOrStr, label: bool = False):
+def read_arff(path: PathOrStr, label: bool = False, cache: bool = True):
     path = Path(path)
-    with open(path) as fid:
-        data = arff.load(fid)
+    # Parsing text ARFF is slow, so keep a hidden netCDF copy alongside
+    # it. The label column is nominal, so only unlabelled files are cached.
+    cache_path = path.with_name(f".{path.name}.nc")
+    cache = cache and not label
+    if (
+        cache
+        and cache_path.exists()
+        and cache_path.stat().st_mtime >= path.stat().st_mtime
+    ):
+        return read_netcdf(cache_path)
 
-    attr_names = [x[0] for x in data["attributes"]]
-    counts = Counter([x[0] for x in data["data"]])
     idx = slice(1, -1) if label else slice(1, None)
+    names = []
 
-    return FeaturesData(
+    def _values(rows):
+        for row in rows:
+            names.append(row[0])
+            yield from row[idx]
+
+    with open(path) as fid:
+        data = arff.load(fid, return_type=arff.DENSE_GEN)
+        feature_names = [x[0] for x in data["attributes"]][idx]
+        # Stream decoded rows straight into a single float32 buffer
+        # rather than materialising the whole file as nested lists
+        features = np.fromiter(_values(data["data"]), dtype=np.float32)
+    features = features.reshape(len(names), len(feature_names))
+    counts = Counter(names)
+
+    data = FeaturesData(
         corpus=data["relation"],
         names=list(counts.keys()),
-        features=np.array([x[idx] for x in data["data"]]),
+        features=features,
         slices=np.array(list(counts.values())),
-        feature_names=attr_names[idx],
+        feature_names=feature_names,
     )
+    if cache:
+        # Write to a temporary sibling first so that an interrupted write
+        # never leaves a partial cache that looks up to date
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            data.write_netcdf(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            warnings.warn(f"Could not cache features to {cache_path}: {e}")
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+    return data
 
 
 def read_csv(path: PathOrStr, header: bool = True, label: bool = False):
@@ -60,19 +95,21 @@ def read_csv(path: PathOrStr, header: bool = True, label: bool = False):
 
 def read_netcdf(path: PathOrStr):
     with netCDF4.Dataset(path) as dataset:
+        # Read each variable in a single slice, as plain (unmasked)
+        # arrays, to avoid per-element reads and intermediate copies
+        dataset.set_auto_mask(False)
         return FeaturesData(
             corpus=dataset.corpus,
-            names=list(dataset.variables["name"]),
-            features=np.array(dataset.variables["features"], copy=False),
-            slices=np.array(dataset.variables["slices"]),
-            feature_names=list(dataset.variables["feature_names"]),
+            names=list(dataset.variables["name"][:]),
+            features=dataset.variables["features"][:],
+            slices=dataset.variables["slices"][:],
+            feature_names=list(dataset.variables["feature_names"][:]),
         )
 
 
 def read_raw(path: PathOrStr, sample_rate: int = 16000):
     path = Path(path)
     filepaths = get_audio_paths(path)
-    _audio = []
 
     def read_one_file(filepath):
         with warnings.catch_warnings():
@@ -81,9 +118,11 @@ def read_raw(path: PathOrStr, sample_rate: int = 16000):
             )
         return np.expand_dims(audio, -1)
 
-    _audio = TqdmParallel(len(filepaths), desc="Reading audio", leave=False, n_jobs=-1)(
-        delayed(read_one_file)(filepath) for filepath in filepaths
-    )
+    # Decoding is mostly done in libsndfile, which releases the GIL, so
+    # threads avoid pickling every decoded array back from a subprocess
+    _audio = TqdmParallel(
+        len(filepaths), desc="Reading audio", leave=False, n_jobs=-1, prefer="threads"
+    )(delayed(read_one_file)(filepath) for filepath in filepaths)
 
     return FeaturesData(
         corpus=path.parent.stem,
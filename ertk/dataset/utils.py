@@ -39,13 +39,16 @@ def get_audio_paths(path: PathOrStr, absolute: bool = True) -> List[Path]:
     return paths
 
 
-def resample_rename_clips(mapping: Mapping[Path, Path]):
+def resample_rename_clips(mapping: Mapping[Path, Path], n_jobs: int = -1):
     """Resample given audio clips to 16 kHz 16-bit WAV.
 
     Args:
     -----
     mapping: mapping
         Mapping from source files to destination files.
+    n_jobs: int
+        Number of parallel FFmpeg processes. Default is -1, which uses
+        all CPU cores.
     """
     dst_dirs = {x.parent for x in mapping.values()}
     for dir in dst_dirs:
@@ -54,7 +57,9 @@ def resample_rename_clips(mapping: Mapping[Path, Path]):
     opts = ["-nostdin", "-ar", "16000", "-sample_fmt", "s16", "-ac", "1", "-y"]
     logging.info(f"Resampling {len(mapping)} audio files")
     logging.info(f"Using FFmpeg options: {' '.join(opts)}")
-    TqdmParallel(desc="Resampling audio", total=len(mapping), unit="file", n_jobs=-1)(
+    TqdmParallel(
+        desc="Resampling audio", total=len(mapping), unit="file", n_jobs=n_jobs
+    )(
         delayed(subprocess.run)(
             ["ffmpeg", "-i", str(src), *opts, str(dst)],
             stdout=subprocess.DEVNULL,
@@ -64,7 +69,7 @@ def resample_rename_clips(mapping: Mapping[Path, Path]):
     )
 
 
-def resample_audio(paths: Iterable[Path], dir: PathOrStr):
+def resample_audio(paths: Iterable[Path], dir: PathOrStr, n_jobs: int = -1):
     """Resample given audio clips to 16 kHz 16-bit WAV, and place in
     direcotory given by `dir`.
 
@@ -74,12 +79,15 @@ def resample_audio(paths: Iterable[Path], dir: PathOrStr):
         A collection of paths to audio files to resample.
     dir: Pathlike or str
         Output directory.
+    n_jobs: int
+        Number of parallel FFmpeg processes. Default is -1, which uses
+        all CPU cores.
     """
     paths = list(paths)
     if len(paths) == 0:
         raise FileNotFoundError("No audio files found.")
 
-    resample_rename_clips({x: Path(dir, f"{x.stem}.wav") for x in paths})
+    resample_rename_clips({x: Path(dir, f"{x.stem}.wav") for x in paths}, n_jobs=n_jobs)
 
 
 def write_filelist(paths: Iterable[Path], name: str):
@@ -164,7 +164,8 @@ def tf_cross_validate(
         data_fn(x, y, shuffle=True, **kwargs).
     fit_params: dict, optional
         Any keyword arguments to supply to the Keras fit() method.
-        Default is no keyword arguments.
+        Default is no keyword arguments. Any given callbacks are used
+        for every fold.
     """
     for gpu in tf.config.list_physical_devices("GPU"):
         tf.config.experimental.set_memory_growth(gpu, True)
@@ -172,6 +173,9 @@ def tf_cross_validate(
     log_dir = fit_params.pop("log_dir", None)
     sw = fit_params.pop("sample_weight", None)
     data_fn = fit_params.pop("data_fn", None)
+    # Callbacks reset their state in on_train_begin(), so can be reused
+    # across folds
+    user_callbacks = fit_params.pop("callbacks", [])
 
     logging.debug(f"log_dir={log_dir}")
     logging.debug(f"sample_weight={sw}")
@@ -192,7 +196,7 @@ def tf_cross_validate(
         sw_train = sw[train] if sw is not None else None
         sw_test = sw[test] if sw is not None else None
 
-        callbacks = []
+        callbacks = list(user_callbacks)
         if log_dir is not None:
             callbacks.append(
                 TensorBoard(
@@ -45,6 +45,7 @@ def model(n_features: int, n_classes: int) -> Model:
         n_classes,
         activation="softmax",
         kernel_initializer="he_normal",
+        dtype="float32",
         name="emotion_prediction",
     )(x)
     return Model(inputs=inputs, outputs=x)
@@ -1,44 +1,68 @@
+from typing import List, Optional, Tuple
+
 import tensorflow as tf
 from tensorflow.keras import Model
-from tensorflow.keras.layers import (
-    RNN,
-    AbstractRNNCell,
-    Bidirectional,
-    Dense,
-    GRUCell,
-    Input,
-    StackedRNNCells,
-    concatenate,
-)
+from tensorflow.keras.layers import GRU, Dense, Dropout, Input, concatenate
 
 __all__ = ["audeep_trae"]
 
 
-def _dropout_gru_cell(units: int = 256, dropout: float = 0.8) -> AbstractRNNCell:
-    return tf.nn.RNNCellDropoutWrapper(
-        GRUCell(units, name="gru_cell"), 1 - dropout, 1 - dropout
-    )
+def _gru_stack(
+    inputs: tf.Tensor,
+    units: int = 256,
+    layers: int = 2,
+    dropout: float = 0.2,
+    initial_state: Optional[List[tf.Tensor]] = None,
+    name: str = "gru",
+) -> Tuple[tf.Tensor, List[tf.Tensor]]:
+    x = inputs
+    states = []
+    for i in range(layers):
+        # The default GRU config (tanh, reset_after, no recurrent
+        # dropout) uses the fused CuDNN kernel when run on GPU.
+        gru = GRU(
+            units,
+            dropout=dropout,
+            return_sequences=True,
+            return_state=True,
+            time_major=True,
+            name=f"{name}_{i}",
+        )
+        x, state = gru(
+            x, initial_state=None if initial_state is None else initial_state[i]
+        )
+        # GRU only drops its inputs, so also drop each layer's outputs, as
+        # the original auDeep cell dropout wrapper does
+        x = Dropout(dropout, name=f"{name}_{i}_dropout")(x)
+        states.append(state)
+    return x, states
 
 
 def _make_rnn(
+    inputs: tf.Tensor,
     units: int = 256,
     layers: int = 2,
     bidirectional: bool = False,
     dropout: float = 0.2,
+    initial_state: Optional[List[tf.Tensor]] = None,
     name="rnn",
-) -> RNN:
-    cells = [_dropout_gru_cell(units, dropout) for _ in range(layers)]
-    stacked_cell = StackedRNNCells(cells)
-    rnn = RNN(
-        stacked_cell,
-        return_sequences=True,
-        return_state=True,
-        time_major=True,
-        name=name,
-    )
+) -> List[tf.Tensor]:
+    """Runs a (possibly bidirectional) stack of time-major GRU layers.
+    Returns the output sequence followed by the final state of each
+    layer, forward states first, in the same way as a `RNN` of
+    `StackedRNNCells` wrapped in `Bidirectional`.
+    """
+    fw_init = bw_init = None
+    if initial_state is not None:
+        fw_init, bw_init = initial_state[:layers], initial_state[layers:]
+    outputs, states = _gru_stack(inputs, units, layers, dropout, fw_init, name=name)
     if bidirectional:
-        rnn = Bidirectional(rnn, name="bidirectional_" + name)
-    return rnn
+        bw_outputs, bw_states = _gru_stack(
+            inputs[::-1], units, layers, dropout, bw_init, name=name + "_backward"
+        )
+        outputs = concatenate([outputs, bw_outputs[::-1]])
+        states += bw_states
+    return [outputs, *states]
 
 
 def audeep_trae(
@@ -47,14 +71,16 @@ def audeep_trae(
     layers: int = 2,
     bidirectional_encoder: bool = False,
     bidirectional_decoder: bool = False,
+    dropout: float = 0.2,
 ) -> Model:
     inputs = Input(input_shape)
 
     trans = tf.transpose(inputs, [1, 0, 2])
 
     # Make encoder layers
-    encoder = _make_rnn(units, layers, bidirectional_encoder, name="encoder")
-    enc_states = encoder(trans)[1:]
+    _, *enc_states = _make_rnn(
+        trans, units, layers, bidirectional_encoder, dropout, name="encoder"
+    )
     encoder_output = concatenate(enc_states, name="encoder_output_state")
 
     # Fully connected needs to have output dimension equal to dimension of
@@ -73,22 +99,34 @@ def audeep_trae(
         axis=-1,
         name="decoder_init_state",
     )
-    # Decoder input is reversed and shifted input sequence
-    targets = trans[:0:-1]
-    dec_inputs = tf.pad(
-        targets, [[1, 0], [0, 0], [0, 0]], name="decoder_input_sequence"
+    # Decoder input is reversed and shifted input sequence, i.e. the
+    # reversed sequence rolled by one step with the first step zeroed
+    first_step_mask = tf.one_hot(0, tf.shape(trans)[0], on_value=0.0, off_value=1.0)
+    dec_inputs = tf.multiply(
+        tf.roll(trans[::-1], shift=1, axis=0),
+        first_step_mask[:, None, None],
+        name="decoder_input_sequence",
     )
 
     # Make decoder layers and init with output from fully connected layer
-    decoder = _make_rnn(units, layers, bidirectional_decoder, name="decoder")
-    decoder_output = decoder(dec_inputs, initial_state=decoder_init_state)[0]
+    decoder_output = _make_rnn(
+        dec_inputs,
+        units,
+        layers,
+        bidirectional_decoder,
+        dropout,
+        initial_state=decoder_init_state,
+        name="decoder",
+    )[0]
 
     n_features = input_shape[-1]
     reconstruction = Dense(n_features, activation="tanh", name="reconstruction")(
         decoder_output
     )
 
-    reconstruction = tf.transpose(reconstruction, [1, 0, 2])
+    # The decoder reconstructs the sequence in reverse. Undo this while
+    # still time-major, where it is a contiguous copy per time step.
+    reconstruction = tf.transpose(reconstruction[::-1], [1, 0, 2])
 
     model = Model(inputs=inputs, outputs=[reconstruction, representation])
     return model
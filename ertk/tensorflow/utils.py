@@ -239,15 +239,14 @@ def tf_dataset_mem_ragged(
         return x.to_tensor(), y, sample_weight
 
     # Sort according to length
-    perm = np.argsort([len(a) for a in x])
+    lengths = np.fromiter(map(len, x), dtype=np.int64, count=len(x))
+    perm = np.argsort(lengths)
     x = x[perm]
     y = y[perm]
     if sample_weight is not None:
         sample_weight = sample_weight[perm]
 
-    ragged = tf.RaggedTensor.from_row_lengths(
-        np.concatenate(list(x)), [len(a) for a in x]
-    )
+    ragged = tf.RaggedTensor.from_row_lengths(np.concatenate(x), lengths[perm])
     with tf.device("CPU"):
         if sample_weight is None:
             data = tf.data.Dataset.from_tensor_slices((ragged, y))
@@ -173,18 +173,24 @@ def flat_to_inst(x: np.ndarray, slices: np.ndarray) -> np.ndarray:
     feature vector/matrix per instance.
     """
 
+    slices = np.asarray(slices)
     if len(x) == len(slices):
         # 2-D contiguous array
         return x
-    elif all(x == slices[0] for x in slices):
+    elif np.all(slices == slices[0]):
         # 3-D contiguous array
         assert len(x) % len(slices) == 0
         seq_len = len(x) // len(slices)
         return np.reshape(x, (len(slices), seq_len, x[0].shape[-1]))
     else:
-        # 3-D variable length array
+        # 3-D variable length array. The views are assigned into a
+        # preallocated object array so NumPy doesn't try to broadcast
+        # them to a common shape.
         start_idx = np.cumsum(slices)[:-1]
-        return np.array(np.split(x, start_idx, axis=0), dtype=object)
+        arr = np.empty(len(slices), dtype=object)
+        for i, seq in enumerate(np.split(x, start_idx, axis=0)):
+            arr[i] = seq
+        return arr
 
 
 def inst_to_flat(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
@@ -249,14 +255,24 @@ def pad_arrays(arrays: Union[List[np.ndarray], np.ndarray], pad: int = 32):
         padding = int(np.ceil(arrays.shape[1] / pad)) * pad - arrays.shape[1]
         extra_dims = tuple((0, 0) for _ in arrays.shape[2:])
         return np.pad(arrays, ((0, 0), (0, padding)) + extra_dims)
-    new_arrays = []
-    for x in arrays:
-        padding = int(np.ceil(x.shape[0] / pad)) * pad - x.shape[0]
-        new_arrays.append(np.pad(x, ((0, padding), (0, 0))))
-    if isinstance(arrays, np.ndarray):
-        if all(x.shape == new_arrays[0].shape for x in new_arrays):
-            return np.array(new_arrays)
-        return np.array(new_arrays, dtype=object)
+    if len(arrays) == 0:
+        return np.array([]) if isinstance(arrays, np.ndarray) else []
+    lengths = np.fromiter(map(len, arrays), dtype=np.int64, count=len(arrays))
+    padded = -(-lengths // pad) * pad
+    # Copy into a single zeroed buffer instead of calling np.pad() on
+    # every array, then return views of the buffer
+    flat = np.zeros((padded.sum(),) + arrays[0].shape[1:], dtype=arrays[0].dtype)
+    starts = np.cumsum(padded) - padded
+    for x, start in zip(arrays, starts):
+        flat[start : start + len(x)] = x
+    if not isinstance(arrays, np.ndarray):
+        return np.split(flat, starts[1:])
+    if np.all(padded == padded[0]):
+        # All padded to the same length, so return a contiguous array
+        return flat.reshape((len(arrays), padded[0]) + flat.shape[1:])
+    new_arrays = np.empty(len(arrays), dtype=object)
+    for i, x in enumerate(np.split(flat, starts[1:])):
+        new_arrays[i] = x
     return new_arrays
 
 
@@ -452,17 +468,24 @@ def group_transform(
     """
     if not inplace:
         x = x.copy()
-    unique_groups = np.unique(groups)
-    for g_id in unique_groups:
-        flat, slices = inst_to_flat(x[groups == g_id])
+    # Sort once so that each group is a contiguous run of indices,
+    # rather than computing a boolean mask over all instances per group
+    groups = np.asarray(groups)
+    if len(groups) == 0:
+        return x
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    bounds = np.flatnonzero(sorted_groups[1:] != sorted_groups[:-1]) + 1
+    for idx in np.split(order, bounds):
+        flat, slices = inst_to_flat(x[idx])
         flat = transform.fit_transform(flat, y=None, **fit_params)
         if len(x.shape) == 1 and len(slices) == 1:
             # Special case to avoid issues for vlen arrays
             _arr = np.empty(1, dtype=object)
             _arr[0] = flat
-            x[groups == g_id] = _arr
+            x[idx] = _arr
             continue
-        x[groups == g_id] = flat_to_inst(flat, slices)
+        x[idx] = flat_to_inst(flat, slices)
     return x
 
 
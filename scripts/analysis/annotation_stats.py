@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Set, Tuple
 
 import click
 import matplotlib.pyplot as plt
@@ -23,11 +23,13 @@ def main(input: Tuple[Path], plot: bool, files: Path):
     shown for each level of INPUT.
     """
 
+    names: Optional[Set[str]] = None
+    if files:
+        names = {Path(x).stem for x in get_audio_paths(files)}
     dfs: List[pd.DataFrame] = []
     for file in input:
         df = pd.read_csv(file, header=0, converters={0: str}).set_index("name")
-        if files:
-            names = {Path(x).stem for x in get_audio_paths(files)}
+        if names is not None:
             df = df[df.index.isin(names)]
         dfs.append(df)
         col = df[df.columns[0]]
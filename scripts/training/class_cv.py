@@ -63,6 +63,13 @@ from ertk.utils import (
 @optgroup.option("--learning_rate", type=float, default=1e-4, show_default=True)
 @optgroup.option("--batch_size", type=int, default=64, show_default=True)
 @optgroup.option("--epochs", type=int, default=50, show_default=True)
+@optgroup.option(
+    "--steps_per_execution",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of TF training batches to run per traced function call.",
+)
 @optgroup.option(
     "--balanced/--imbalanced", default=True, help="Balances sample weights."
 )
@@ -146,6 +153,7 @@ def main(
     learning_rate: float,
     batch_size: int,
     epochs: int,
+    steps_per_execution: int,
     use_inner_cv: bool,
     n_jobs: int,
 ):
@@ -269,12 +277,19 @@ def main(
             {"n_features": dataset.n_features, "n_classes": dataset.n_classes}
         )
 
+        # Only pass steps_per_execution when set, so that the default
+        # compiles exactly as before
+        compile_kwargs = {}
+        if steps_per_execution != 1:
+            compile_kwargs["steps_per_execution"] = steps_per_execution
+
         def model_fn():
             model = get_tf_model(clf_type, **model_args)
             model.compile(
                 Adam(learning_rate=learning_rate),
                 loss="sparse_categorical_crossentropy",
                 metrics=tf_classification_metrics(),
+                **compile_kwargs,
             )
             return Pipeline([("transform", transformer), ("clf", model)])
 
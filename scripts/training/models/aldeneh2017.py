@@ -8,25 +8,31 @@ Acoustics, Speech and Signal Processing (ICASSP), Mar. 2017, pp.
 
 from functools import partial
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import numpy as np
 import tensorflow as tf
-from sklearn.metrics import recall_score
-from sklearn.model_selection import LeaveOneGroupOut, ParameterGrid
+from sklearn.model_selection import GridSearchCV, LeaveOneGroupOut
 from sklearn.preprocessing import StandardScaler
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.layers import Conv1D, Dense, GlobalMaxPool1D, Input, concatenate
+from tensorflow.keras.layers import Conv1D, Dense, GlobalMaxPool1D, Input
 from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import RMSprop
 
-from ertk.classification import print_results, within_corpus_cross_validation
+from ertk.classification import within_corpus_cross_validation
 from ertk.dataset import LabelledDataset
-from ertk.sklearn.classification import SKLearnClassifier
 from ertk.sklearn.models import PrecomputedSVC
-from ertk.tensorflow.classification import BatchedSequence, TFClassifier
+from ertk.tensorflow.classification import tf_classification_metrics
 from ertk.tensorflow.models.aldeneh2017 import model as full_model
 
 RESULTS_DIR = "results/aldeneh2017"
+# Training batches run per traced function call. The callbacks only act at
+# the end of each epoch, so this doesn't change training.
+STEPS_PER_EXECUTION = 32
+SVM_PARAM_GRID = {
+    "C": (2.0 ** np.arange(0, 13, 2)).tolist(),
+    "gamma": (2.0 ** np.arange(-15, -2, 2)).tolist(),
+}
 
 
 def get_dense_model(n_features, n_classes):
@@ -41,6 +47,7 @@ def get_dense_model(n_features, n_classes):
         n_classes,
         activation="softmax",
         kernel_initializer="he_normal",
+        dtype="float32",
         name="emotion_prediction",
     )(x)
     return Model(inputs=inputs, outputs=x, name="aldeneh_dense_model")
@@ -66,49 +73,12 @@ def get_conv_model(n_features, n_classes, n_filters=128, kernel_size=8):
         n_classes,
         activation="softmax",
         kernel_initializer="he_normal",
+        dtype="float32",
         name="emotion_prediction",
     )(x)
     return Model(inputs=inputs, outputs=x, name="aldeneh_conv_model")
 
 
-def get_full_model(n_features, n_classes):
-    inputs = Input(shape=(None, n_features), name="input")
-    x = Conv1D(384, 8, activation="relu", kernel_initializer="he_normal", name="conv8")(
-        inputs
-    )
-    c1 = GlobalMaxPool1D(name="maxpool_1")(x)
-
-    x = Conv1D(
-        384, 16, activation="relu", kernel_initializer="he_normal", name="conv16"
-    )(inputs)
-    c2 = GlobalMaxPool1D(name="maxpool_2")(x)
-
-    x = Conv1D(
-        384, 32, activation="relu", kernel_initializer="he_normal", name="conv32"
-    )(inputs)
-    c3 = GlobalMaxPool1D(name="maxpool_3")(x)
-
-    x = Conv1D(
-        384, 64, activation="relu", kernel_initializer="he_normal", name="conv64"
-    )(inputs)
-    c4 = GlobalMaxPool1D(name="maxpool_4")(x)
-
-    x = concatenate(name="concatenate")([c1, c2, c3, c4])
-    x = Dense(1024, activation="relu", kernel_initializer="he_normal", name="dense_1")(
-        x
-    )
-    x = Dense(1024, activation="relu", kernel_initializer="he_normal", name="dense_2")(
-        x
-    )
-    x = Dense(
-        n_classes,
-        activation="softmax",
-        kernel_initializer="he_normal",
-        name="emotion_prediction",
-    )(x)
-    return Model(inputs=inputs, outputs=x, name="aldeneh_full_model")
-
-
 def optimizer_fn():
     return RMSprop(learning_rate=0.0001)
 
@@ -122,85 +92,125 @@ def callbacks_fn():
     ]
 
 
-def get_tf_dataset(x: np.ndarray, y: np.ndarray, shuffle=True, batch_size=50):
-    def ragged_to_dense(x, y):
-        return x.to_tensor(), y
+def get_compiled_model_fn(model_fn: Callable[[], Model]) -> Callable[[], Model]:
+    """Wraps `model_fn` to return a new compiled model for each fold."""
 
-    # Sort according to length
-    perm = np.argsort([len(a) for a in x])
-    x = x[perm]
-    y = y[perm]
+    # Only pass steps_per_execution when set, so that the default compiles
+    # exactly as before
+    compile_kwargs = {}
+    if STEPS_PER_EXECUTION != 1:
+        compile_kwargs["steps_per_execution"] = STEPS_PER_EXECUTION
 
-    ragged = tf.RaggedTensor.from_row_lengths(
-        np.concatenate(list(x)), [len(a) for a in x]
-    )
-    data = tf.data.Dataset.from_tensor_slices((ragged, y))
-    # Group similar lengths in batches, then shuffle batches
-    data = data.batch(batch_size)
-    if shuffle:
-        data = data.shuffle(500)
-    return data.map(ragged_to_dense)
+    def compiled_model_fn():
+        model = model_fn()
+        model.compile(
+            optimizer_fn(),
+            loss="sparse_categorical_crossentropy",
+            metrics=tf_classification_metrics(),
+            **compile_kwargs,
+        )
+        return model
 
+    return compiled_model_fn
+
+
+def get_fit_params(dataset: LabelledDataset, data_fn) -> Dict[str, Any]:
+    return {
+        "epochs": 50,
+        "batch_size": 50,
+        "sample_weight": get_sample_weight(dataset),
+        "data_fn": data_fn,
+        "callbacks": callbacks_fn(),
+    }
 
-def test_svm_models(dataset: LabelledDataset, config: str):
-    param_grid = ParameterGrid(
-        {"C": 2.0 ** np.arange(0, 13, 2), "gamma": 2.0 ** np.arange(-15, -2, 2)}
-    )
 
+def get_sample_weight(dataset: LabelledDataset) -> np.ndarray:
+    """Per-instance weights that balance the classes."""
+    class_weight = dataset.n_instances / (dataset.n_classes * dataset.class_counts)
+    return class_weight[dataset.y]
+
+
+def get_tf_dataset(
+    x: np.ndarray,
+    y: np.ndarray,
+    sample_weight: Optional[np.ndarray] = None,
+    shuffle=True,
+    batch_size=50,
+):
+    n_features = x[0].shape[-1]
+    sig: Tuple[tf.TensorSpec, ...] = (
+        tf.TensorSpec(shape=(None, n_features), dtype=tf.float32),
+        tf.TensorSpec(shape=(), dtype=tf.int64),
+    )
+    if sample_weight is None:
+        data = tf.data.Dataset.from_generator(lambda: zip(x, y), output_signature=sig)
+    else:
+        sig += (tf.TensorSpec(shape=(), dtype=tf.float32),)
+        data = tf.data.Dataset.from_generator(
+            lambda: zip(x, y, sample_weight), output_signature=sig
+        )
+    if shuffle:
+        data = data.shuffle(len(x))
+    # Group similar lengths in batches, each padded to its longest sequence
+    bucket_boundaries = [100, 200, 400, 800]
+    data = data.apply(
+        tf.data.experimental.bucket_by_sequence_length(
+            lambda x, *_: tf.shape(x)[0],
+            bucket_boundaries=bucket_boundaries,
+            bucket_batch_sizes=[batch_size] * 5,
+        )
+    )
+    # Keras needs the number of batches to run more than one step per
+    # execution, but can't infer it through from_generator()
+    lengths = np.fromiter(map(len, x), dtype=np.int64, count=len(x))
+    bucket_sizes = np.bincount(np.digitize(lengths, bucket_boundaries))
+    n_batches = int(np.sum(-(-bucket_sizes // batch_size)))
+    data = data.apply(tf.data.experimental.assert_cardinality(n_batches))
+    return data.prefetch(tf.data.AUTOTUNE)
+
+
+def test_svm_models(dataset: LabelledDataset, config: str, n_jobs: int = -1):
+    clf = GridSearchCV(
+        PrecomputedSVC(kernel="rbf", class_weight="balanced"),
+        SVM_PARAM_GRID,
+        scoring="balanced_accuracy",
+        cv=2,
+        n_jobs=1,
+    )
     df = within_corpus_cross_validation(
-        SKLearnClassifier(
-            partial(PrecomputedSVC, kernel="rbf", class_weight="balanced")
-        ),
+        clf,
         dataset,
-        reps=1,
-        splitter=LeaveOneGroupOut(),
-        param_grid=param_grid,
-        cv_score_fn=partial(recall_score, average="macro"),
+        clf_lib="sk",
+        partition="speaker",
+        cv=LeaveOneGroupOut(),
+        n_jobs=n_jobs,
     )
 
-    print_results(df)
+    print(df.mean().to_string())
     output_dir = Path(RESULTS_DIR) / dataset.corpus / "svm"
     output_dir.mkdir(parents=True, exist_ok=True)
     df.to_csv(output_dir / "{}.csv".format(config))
 
 
 def test_dense_model(dataset: LabelledDataset, config: str = "logmel_func"):
-    model = get_dense_model(480, 4)
-    model.summary()
-    del model
-    tf.keras.backend.clear_session()
-
-    class_weight = dataset.n_instances / (dataset.n_classes * dataset.class_counts)
-    class_weight = dict(zip(range(dataset.n_classes), class_weight))
-
     df = within_corpus_cross_validation(
-        TFClassifier(partial(get_dense_model, dataset.n_features, dataset.n_classes)),
+        get_compiled_model_fn(
+            partial(get_dense_model, dataset.n_features, dataset.n_classes)
+        ),
         dataset,
-        reps=1,
-        splitter=LeaveOneGroupOut(),
-        n_epochs=50,
-        class_weight=class_weight,
-        data_fn=partial(BatchedSequence, batch_size=50),
-        callbacks=callbacks_fn(),
-        optimizer=optimizer_fn(),
-        verbose=False,
+        clf_lib="tf",
+        partition="speaker",
+        cv=LeaveOneGroupOut(),
+        fit_params=get_fit_params(dataset, "mem"),
     )
 
-    print_results(df)
+    print(df.mean().to_string())
     output_dir = Path(RESULTS_DIR) / dataset.corpus / "dense"
     output_dir.mkdir(parents=True, exist_ok=True)
     df.to_csv(output_dir / "{}.csv".format(config))
 
 
 def test_conv_models(dataset: LabelledDataset, config: str = "logmel"):
-    model = get_conv_model(40, dataset.n_classes)
-    model.summary()
-    del model
-    tf.keras.backend.clear_session()
-
-    class_weight = dataset.n_instances / (dataset.n_classes * dataset.class_counts)
-    class_weight = dict(zip(range(dataset.n_classes), class_weight))
-
     for n_filters, kernel_size in [
         (384, 8),
         (288, 16),
@@ -210,7 +220,7 @@ def test_conv_models(dataset: LabelledDataset, config: str = "logmel"):
     ]:
         print("(n_filters, kernel_size) = ({}, {})".format(n_filters, kernel_size))
         df = within_corpus_cross_validation(
-            TFClassifier(
+            get_compiled_model_fn(
                 partial(
                     get_conv_model,
                     dataset.n_features,
@@ -220,45 +230,31 @@ def test_conv_models(dataset: LabelledDataset, config: str = "logmel"):
                 )
             ),
             dataset,
-            reps=1,
-            splitter=LeaveOneGroupOut(),
-            n_epochs=50,
-            class_weight=class_weight,
-            data_fn=get_tf_dataset,
-            callbacks=callbacks_fn(),
-            optimizer=optimizer_fn(),
-            verbose=False,
+            clf_lib="tf",
+            partition="speaker",
+            cv=LeaveOneGroupOut(),
+            fit_params=get_fit_params(dataset, get_tf_dataset),
         )
 
-        print_results(df)
+        print(df.mean().to_string())
         output_dir = Path(RESULTS_DIR) / dataset.corpus / "conv"
         output_dir.mkdir(parents=True, exist_ok=True)
         df.to_csv(output_dir / "{}_{}.csv".format(config, kernel_size))
 
 
 def test_full_model(dataset: LabelledDataset, config: str = "logmel"):
-    model = full_model(40, dataset.n_classes)
-    model.summary()
-    del model
-    tf.keras.backend.clear_session()
-
-    class_weight = dataset.n_instances / (dataset.n_classes * dataset.class_counts)
-    class_weight = dict(zip(range(dataset.n_classes), class_weight))
-
     df = within_corpus_cross_validation(
-        TFClassifier(partial(full_model, dataset.n_features, dataset.n_classes)),
+        get_compiled_model_fn(
+            partial(full_model, dataset.n_features, dataset.n_classes)
+        ),
         dataset,
-        reps=1,
-        splitter=LeaveOneGroupOut(),
-        n_epochs=50,
-        class_weight=class_weight,
-        data_fn=get_tf_dataset,
-        callbacks=callbacks_fn(),
-        optimizer=optimizer_fn(),
-        verbose=False,
+        clf_lib="tf",
+        partition="speaker",
+        cv=LeaveOneGroupOut(),
+        fit_params=get_fit_params(dataset, get_tf_dataset),
     )
 
-    print_results(df)
+    print(df.mean().to_string())
     output_dir = Path(RESULTS_DIR) / dataset.corpus / "conv_dense"
     output_dir.mkdir(parents=True, exist_ok=True)
     df.to_csv(output_dir / "{}_full.csv".format(config))
@@ -266,29 +262,34 @@ def test_full_model(dataset: LabelledDataset, config: str = "logmel"):
 
 def main():
     tf.get_logger().setLevel(40)  # ERROR level
-    for gpu in tf.config.list_physical_devices("GPU"):
+    gpus = tf.config.list_physical_devices("GPU")
+    for gpu in gpus:
         tf.config.experimental.set_memory_growth(gpu, True)
+    if gpus:
+        # The softmax output layers are kept in float32 for stability
+        tf.keras.mixed_precision.set_global_policy("mixed_float16")
+        tf.config.optimizer.set_jit(True)
 
-    CORPORA = ["iemocap", "msp-improv"]
+    CORPORA = ["IEMOCAP", "MSP-IMPROV"]
     for corpus in CORPORA:
         for config in ["IS09", "IS13_IS09_func", "GeMAPS", "eGeMAPS"]:
             print(corpus, config)
-            dataset = LabelledDataset(f"output/{corpus}/{config}.nc")
-            dataset.normalise(StandardScaler(), scheme="speaker")
+            dataset = LabelledDataset(f"datasets/{corpus}/corpus.yaml", config)
+            dataset.normalise(partition="speaker", normaliser=StandardScaler())
             print()
             test_svm_models(dataset, config)
 
     for corpus in CORPORA:
         print(corpus, "logmel_IS09_func")
-        dataset = LabelledDataset(f"output/{corpus}/logmel_IS09_func.nc")
-        dataset.normalise(StandardScaler(), scheme="speaker")
+        dataset = LabelledDataset(f"datasets/{corpus}/corpus.yaml", "logmel_IS09_func")
+        dataset.normalise(partition="speaker", normaliser=StandardScaler())
         print()
         test_dense_model(dataset, "logmel_IS09_func")
 
     for corpus in CORPORA:
         print(corpus, "logmel")
-        dataset = LabelledDataset(f"output/{corpus}/logmel.nc")
-        dataset.normalise(StandardScaler(), scheme="speaker")
+        dataset = LabelledDataset(f"datasets/{corpus}/corpus.yaml", "logmel")
+        dataset.normalise(partition="speaker", normaliser=StandardScaler())
         dataset.pad_arrays(32)
         print()
         try:
@@ -22,32 +22,26 @@ import tensorflow as tf
 from tensorflow.keras.models import load_model
 from tqdm import tqdm
 
-from ertk.tensorflow.models import audeep_trae
+from ertk.tensorflow.models.audeep import audeep_trae
 
 
-def _make_functions(model, optimizer, strategy, use_function=True):
+def _make_functions(model, optimizer, strategy, use_function=True, jit_compile=False):
     def train_step(data):
         with tf.GradientTape() as tape:
             reconstruction, _ = model(data, training=True)
-            targets = data[:, ::-1, :]
-            loss = tf.sqrt(
-                tf.reduce_mean(tf.math.squared_difference(targets, reconstruction))
-            )
+            # MSE has the same minimum as RMSE but avoids differentiating
+            # through the sqrt; RMSE is still what is reported
+            loss = tf.reduce_mean(tf.math.squared_difference(data, reconstruction))
 
         trainable_vars = model.trainable_variables
         gradients = tape.gradient(loss, trainable_vars)
-        clipped_gvs = [tf.clip_by_value(x, -2, 2) for x in gradients]
-        # clipped_gvs, _ = tf.clip_by_global_norm(gradients, 2)
-        optimizer.apply_gradients(zip(clipped_gvs, trainable_vars))
+        optimizer.apply_gradients(zip(gradients, trainable_vars))
 
-        return loss
+        return tf.sqrt(loss)
 
     def test_step(data):
         reconstruction, _ = model(data, training=False)
-        targets = data[:, ::-1, :]
-        loss = tf.sqrt(
-            tf.reduce_mean(tf.math.squared_difference(targets, reconstruction))
-        )
+        loss = tf.sqrt(tf.reduce_mean(tf.math.squared_difference(data, reconstruction)))
 
         return loss
 
@@ -64,13 +58,43 @@ def _make_functions(model, optimizer, strategy, use_function=True):
         )
 
     if use_function:
-        dist_train_step = tf.function(dist_train_step)
-        dist_test_step = tf.function(dist_test_step)
+        # jit_compile is only accepted by TF >= 2.5, so only pass it when
+        # XLA is requested
+        kwargs = {"jit_compile": True} if jit_compile else {}
+        dist_train_step = tf.function(dist_train_step, **kwargs)
+        dist_test_step = tf.function(dist_test_step, **kwargs)
 
     return dist_train_step, dist_test_step
 
 
+def _batch_dataset(x, batch_size: int, shuffle: bool = False) -> tf.data.Dataset:
+    """Creates a dataset of batches from `x` (a NumPy array or netCDF
+    variable). Only instance indices go through the pipeline and each
+    batch is gathered from `x` on demand, rather than copying all of `x`
+    into a tensor up front. Batches are only gathered in parallel when
+    `x` is a NumPy array.
+    """
+
+    def gather(idx):
+        # netCDF needs increasing indices
+        return np.asarray(x[np.sort(idx)], dtype=np.float32)
+
+    def load_batch(idx):
+        batch = tf.numpy_function(gather, [idx], tf.float32)
+        batch.set_shape((None, *x.shape[1:]))
+        return batch
+
+    # netCDF-C is not thread-safe, so only gather in parallel from arrays
+    num_parallel_calls = tf.data.AUTOTUNE if isinstance(x, np.ndarray) else None
+    data = tf.data.Dataset.range(len(x))
+    if shuffle:
+        data = data.shuffle(len(x))
+    return data.batch(batch_size).map(load_batch, num_parallel_calls=num_parallel_calls)
+
+
 def train(args):
+    if args.xla and args.multi_gpu:
+        raise ValueError("--xla is only supported without --multi_gpu.")
     args.logs.parent.mkdir(parents=True, exist_ok=True)
     train_log_dir = str(args.logs / "train")
     valid_log_dir = str(args.logs / "valid")
@@ -86,33 +110,33 @@ def train(args):
         strategy = tf.distribute.MirroredStrategy()
 
     # Get data
-    dataset = netCDF4.Dataset(str(args.dataset))
-    x = np.array(dataset.variables["features"])
-    dataset.close()
+    with netCDF4.Dataset(str(args.dataset)) as dataset:
+        dataset.set_auto_mask(False)
+        x = dataset.variables["features"][:]
     n_spectrograms, max_time, features = x.shape
     np.random.default_rng().shuffle(x)
     n_valid = int(n_spectrograms * args.valid_fraction)
+    # Validation batches never change, so gather them only once
     valid_data = (
-        tf.data.Dataset.from_tensor_slices(x[:n_valid])
-        .batch(args.batch_size)
-        .prefetch(10)
+        _batch_dataset(x[:n_valid], args.batch_size).cache().prefetch(tf.data.AUTOTUNE)
     )
+    options = tf.data.Options()
+    options.experimental_deterministic = False
     train_data = (
-        tf.data.Dataset.from_tensor_slices(x[n_valid:])
-        .shuffle(n_spectrograms)
-        .batch(args.batch_size)
-        .prefetch(100)
+        _batch_dataset(x[n_valid:], args.batch_size, shuffle=True)
+        .prefetch(tf.data.AUTOTUNE)
+        .with_options(options)
     )
-    summary_data = valid_data.take(1)
-    # Reduce memory footprint
-    del x
-
-    train_data = strategy.experimental_distribute_dataset(train_data)
-    valid_data = strategy.experimental_distribute_dataset(valid_data)
+    # Fixed batch used to visualise reconstructions each epoch
+    summary_batch = next(iter(valid_data))
 
+    # Distributed datasets have no len()
     n_train_batches = len(train_data)
     n_valid_batches = len(valid_data)
 
+    train_data = strategy.experimental_distribute_dataset(train_data)
+    valid_data = strategy.experimental_distribute_dataset(valid_data)
+
     step = tf.Variable(1)
     with strategy.scope():
         model = audeep_trae(
@@ -121,9 +145,12 @@ def train(args):
             layers=args.layers,
             bidirectional_encoder=args.bidirectional_encoder,
             bidirectional_decoder=args.bidirectional_decoder,
+            dropout=args.dropout,
         )
         # Using epsilon=1e-5 seems to offer better stability.
-        optimizer = tf.optimizers.Adam(learning_rate=args.learning_rate, epsilon=1e-5)
+        optimizer = tf.optimizers.Adam(
+            learning_rate=args.learning_rate, epsilon=1e-5, clipvalue=2.0
+        )
         model.compile(optimizer=optimizer)
         checkpoint = tf.train.Checkpoint(model=model, optimizer=optimizer, step=step)
     print()
@@ -151,7 +178,10 @@ def train(args):
         checkpoint.restore(checkpoint_manager.latest_checkpoint)
         print(f"Restoring from checkpoint " f"{checkpoint_manager.latest_checkpoint}")
 
-    train_step, test_step = _make_functions(model, optimizer, strategy)
+    train_step, test_step = _make_functions(
+        model, optimizer, strategy, jit_compile=args.xla
+    )
+    predict = tf.function(lambda x: model(x, training=False))
 
     start_epoch = step.value().numpy()
     for epoch in range(start_epoch, start_epoch + args.epochs):
@@ -190,10 +220,8 @@ def train(args):
         with valid_writer.as_default():
             tf.summary.scalar("rmse", valid_loss, step=epoch)
 
-            batch = next(iter(summary_data))
-            reconstruction, representation = model(batch, training=False)
-            reconstruction = reconstruction[:, ::-1, :]
-            images = tf.concat([batch, reconstruction], 2)
+            reconstruction, representation = predict(summary_batch)
+            images = tf.concat([summary_batch, reconstruction], 2)
             images = tf.expand_dims(images, -1)
             images = (images + 1) / 2
             tf.summary.image("combined", images, step=epoch, max_outputs=20)
@@ -212,25 +240,23 @@ def train(args):
 
 
 def generate(args):
-    dataset = netCDF4.Dataset(args.dataset)
-    data = tf.data.Dataset.from_tensor_slices(dataset.variables["features"]).batch(
-        args.batch_size
-    )
-    filenames = np.array(dataset.variables["name"])
-    labels = np.array(dataset.variables["label"])
-    corpus = dataset.corpus
-    dataset.close()
-
     model = load_model(args.model)
     # Optimise model call function
     model.call = tf.function(model.call)
 
-    print(f"Read dataset from {args.dataset}")
-
-    representations = []
-    for batch in tqdm(data):
-        _, representation = model(batch, training=False)
-        representations.append(representation.numpy())
+    with netCDF4.Dataset(args.dataset) as dataset:
+        dataset.set_auto_mask(False)
+        filenames = dataset.variables["name"][:]
+        labels = dataset.variables["label"][:]
+        corpus = dataset.corpus
+        print(f"Read dataset from {args.dataset}")
+
+        # Read spectrograms from disk one batch at a time
+        data = _batch_dataset(dataset.variables["features"], args.batch_size)
+        representations = []
+        for batch in tqdm(data.prefetch(tf.data.AUTOTUNE)):
+            _, representation = model(batch, training=False)
+            representations.append(representation.numpy())
     representations = np.concatenate(representations)
 
     dataset = netCDF4.Dataset(str(args.output), "w")
@@ -285,6 +311,11 @@ def main():
         "--multi_gpu", action="store_true", help="Use all GPUs for training."
     )
     train_args.add_argument("--profile", action="store_true", help="Profile a batch.")
+    train_args.add_argument(
+        "--xla",
+        action="store_true",
+        help="Compile train/test steps with XLA. Not supported with --multi_gpu.",
+    )
     train_args.add_argument(
         "--continue",
         action="store_true",
@@ -315,6 +346,13 @@ def main():
         help="Use a bidirectional decoder.",
     )
 
+    train_args.add_argument(
+        "--dropout",
+        type=float,
+        default=0.2,
+        help="Dropout rate of RNN layer inputs and outputs. 0 disables dropout.",
+    )
+
     gen_args = subparsers.add_parser("generate")
     gen_args.add_argument(
         "--dataset", type=Path, required=True, help="File containing spectrogram data."